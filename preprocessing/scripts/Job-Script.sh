@@ -3,6 +3,9 @@
 # This script loops through all subject IDs and runs fmriprep in parallel
 # Change the SBATCH arguments as you see fit
 #
+# Subject IDs passed on the command line replace the hard-coded list, e.g.,
+# bash Job-Script.sh 11687 10724 (this is how `python3 -m scp watch` submits)
+#
 # Ian Richard Ferguson | Stanford University
 
 project_directory="${SCRATCH}/SCP"
@@ -17,6 +20,10 @@ data_dir="/oak/stanford/groups/jzaki/scp_2022/bids/"
 
 subjects=('11687' '10724' '10617')
 
+if [ $# -gt 0 ]; then
+    subjects=("$@")
+fi
+
 for sub in ${subjects[@]}; do
 
     job_file="${job_directory}/${sub}.job"
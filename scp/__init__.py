@@ -0,0 +1,16 @@
+"""
+ABOUT THIS PACKAGE
+
+Single home for the Oak processing stages that used to live
+in standalone scripts. Run everything through one process with
+
+python3 -m scp <stage> <bids> <sub>
+python3 -m scp pipeline <bids> <sub> --stages hierarchy cleanup
+
+The original scripts under setup/, preprocessing/scripts/ and
+utility-scripts/ are thin shims around these modules
+
+Ian Richard Ferguson | Stanford University
+"""
+
+from scp.project import Project
@@ -0,0 +1,5 @@
+from scp.cli import main
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,182 @@
+"""
+ABOUT THIS MODULE
+
+Times our setup stages (hierarchy, cleanup, intended-for) on a
+synthetic BIDS tree, once with the old sequential I/O path and once
+per requested IOExecutor depth
+
+Local disks answer metadata calls in microseconds, so on a laptop
+the numbers say little about Oak. Either point --root at a scratch
+folder on Oak, or pass --latency to add a fixed delay to every
+rename, listdir, mkdir, scandir and open, which is roughly what a
+Lustre round trip costs us
+
+python3 -m scp.benchmark --subjects 20 --depth 4 8 16 --latency 2
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import argparse, builtins, json, os, shutil, tempfile, time
+
+from scp.executor import IOExecutor
+from scp.project import Project
+
+
+# Same acquisitions as populate.py
+FUNC_RUNS = ["socialeval_run-1", "socialeval_run-2",
+             "stressbuffer_run-1", "stressbuffer_run-1_v2", "stressbuffer_run-2",
+             "faces_run-1", "rest_run-1", "rest_run-2"]
+
+PATCHED = [(os, "rename"), (os, "listdir"), (os, "mkdir"), (os, "scandir"), (builtins, "open")]
+
+
+# --- Helpers
+def touch(path, text=""):
+      with open(path, "w") as outgoing:
+            outgoing.write(text)
+
+
+def build_synthetic_tree(bids_root, n_subjects):
+      """
+      Writes a Flywheel-style export: everything nested under ses-<id>
+      with the session label in every filename
+
+      Parameters
+            bids_root: str | Folder to create the project in
+            n_subjects: int | Number of subjects to create
+      """
+
+      for ix in range(n_subjects):
+            sub = f"sub-{10000 + ix}"
+            ses = f"ses-{20000 + ix}"
+            base = os.path.join(bids_root, sub, ses)
+
+            for k in ["anat", "fmap", "func"]:
+                  os.makedirs(os.path.join(base, k))
+
+            touch(os.path.join(base, "anat", f"{sub}_{ses}_acq-9mmBRAVO_T1w.nii.gz"))
+            touch(os.path.join(base, "anat", f"{sub}_{ses}_acq-9mmBRAVO_T1w.json"), "{}")
+
+            intended = []
+
+            for run in FUNC_RUNS:
+                  stem = f"{sub}_{ses}_task-{run}_bold"
+                  touch(os.path.join(base, "func", f"{stem}.nii.gz"))
+                  touch(os.path.join(base, "func", f"{stem}.json"), "{}")
+                  intended += [f"{ses}/func/{stem}.nii.gz", f"{ses}/func/{stem}.json"]
+
+            for kind in ["fieldmap", "magnitude"]:
+                  touch(os.path.join(base, "fmap", f"{sub}_{ses}_{kind}.nii.gz"))
+                  touch(os.path.join(base, "fmap", f"{sub}_{ses}_{kind}.json"),
+                        json.dumps({"IntendedFor": intended}))
+
+
+def add_latency(seconds):
+      """
+      Wraps filesystem calls with a fixed delay
+
+      Returns
+            Function that restores the original calls
+      """
+
+      originals = [(module, name, getattr(module, name)) for module, name in PATCHED]
+
+      for module, name, fn in originals:
+            def delayed(*args, _fn=fn, **kwargs):
+                  time.sleep(seconds)
+                  return _fn(*args, **kwargs)
+
+            setattr(module, name, delayed)
+
+      def restore():
+            for module, name, fn in originals:
+                  setattr(module, name, fn)
+
+      return restore
+
+
+def run_stages(bids_root, depth):
+      """
+      Runs our setup stages over every subject and returns wall time
+      """
+
+      from scp import hierarchy, cleanup, intended_for
+
+      with IOExecutor(depth=depth) as executor, open(os.devnull, "w") as log:
+            project = Project(bids_root, executor=executor)
+            subjects = project.get_subjects()
+
+            start = time.perf_counter()
+
+            for sub in subjects:
+                  hierarchy.run_single_subject(sub, bids_root, log, project=project)
+
+            for sub in subjects:
+                  cleanup.run_single_subject(sub, bids_root, log, project=project)
+
+            intended_for.run_subjects(bids_root, subjects, log, executor=executor)
+
+            return time.perf_counter() - start
+
+
+def check_tree(bids_root):
+      """
+      Confirms a run left the tree in the expected state
+      """
+
+      for sub in Project(bids_root).get_subjects():
+            path_to_sub_dir = os.path.join(bids_root, f"sub-{sub}")
+
+            if sorted(os.listdir(path_to_sub_dir)) != ["anat", "fmap", "func"]:
+                  raise AssertionError(f"sub-{sub} was not flattened")
+
+            with open(os.path.join(path_to_sub_dir, "fmap", f"sub-{sub}_fieldmap.json")) as incoming:
+                  intended = json.load(incoming)["IntendedFor"]
+
+            if len(intended) != len(FUNC_RUNS) or any("ses-" in x for x in intended):
+                  raise AssertionError(f"sub-{sub} has a bad IntendedFor field")
+
+
+def main(argv=None):
+
+      parser = argparse.ArgumentParser(prog="scp.benchmark")
+      parser.add_argument("--subjects", type=int, default=20)
+      parser.add_argument("--depth", type=int, nargs="+", default=[4, 8, 16])
+      parser.add_argument("--latency", type=float, default=0,
+                          help="Milliseconds added to every filesystem call")
+      parser.add_argument("--root", default=None,
+                          help="Build the synthetic tree here (e.g., scratch on Oak)")
+      args = parser.parse_args(argv)
+
+      workspace = tempfile.mkdtemp(prefix="scp-bench-", dir=args.root)
+
+      print(f"\n** {args.subjects} subjects, {args.latency} ms added latency **\n")
+
+      try:
+            baseline = None
+
+            for depth in [1] + args.depth:
+                  bids_root = os.path.join(workspace, f"depth-{depth}")
+                  build_synthetic_tree(bids_root, args.subjects)
+
+                  restore = add_latency(args.latency / 1000)
+                  try:
+                        elapsed = run_stages(bids_root, depth)
+                  finally:
+                        restore()
+
+                  check_tree(bids_root)
+
+                  if baseline is None:
+                        baseline = elapsed
+                        print(f"sequential:\t{elapsed:.2f} s")
+                  else:
+                        print(f"depth {depth}:\t{elapsed:.2f} s\t({baseline / elapsed:.1f}x)")
+
+      finally:
+            shutil.rmtree(workspace)
+
+
+if __name__ == "__main__":
+      main()
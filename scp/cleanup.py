@@ -0,0 +1,204 @@
+"""
+ABOUT THIS MODULE
+
+This is the second stage run in our pre-fmripep
+pipeline. It performs the following operations:
+
+      * Confirms naming conventions have session ID removed
+      * Isolates JSON files in fmap/ subdirectory
+      * Updates the IntendedFor fields if necessary
+
+Ian Richard Ferguson | Stanford University
+"""
+
+
+# --- Imports
+import os, glob, json
+
+from scp.executor import IOExecutor
+from scp.project import Project
+
+
+# --- Helpers
+def get_session_id(incoming):
+      """
+      Simple helper to isolate a session ID if
+      exists in an oncoming string
+
+      Parameters
+            incoming: str | Pathlike string
+
+      Returns
+            Isolated session ID (e.g., ses-12345) or None
+      """
+
+      if "ses-" in incoming:
+            return [k for k in incoming.split("_") if "func" not in k
+                                            if "anat" not in k
+                                            if "ses-" in k][0]
+
+      return None
+
+
+def get_new_filename(incoming):
+      """
+      Simple helper to remove session ID from filename
+      """
+
+      session_id = get_session_id(incoming)
+
+      return incoming.replace(f"{session_id}/", "").replace(f"{session_id}_", "")
+
+
+def rename_files(path_to_sub_dir, files=None, executor=None):
+      """
+      This function loops through all files in a
+      subject's directory and renames any stragglers that still
+      have session IDs included
+
+      Parameters
+            path_to_sub_dir: str | Relative path to subject's BIDS data
+            files: list | Cached recursive listing of the subject (globbed if None)
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+
+      Returns
+            List of (old, new) renames in the order they were applied
+      """
+
+      if files is None:
+            files = glob.glob(os.path.join(path_to_sub_dir, "**/*"), recursive=True)
+
+      renames = []
+
+      for file in files:
+
+            if "ses-" in file:
+
+                  new_filename = get_new_filename(file)
+
+                  renames.append((file, new_filename))
+
+      (executor or IOExecutor(depth=1)).rename_all(renames)
+
+      return renames
+
+
+def clean_intended_for(incoming):
+      """
+      This function loops through a list (the IntendedFor field
+      of a fmap JSON file) and iteratively renames the files
+
+      Parameters
+            x: List | List of relative paths from IntendedFor field
+
+      Returns
+            List of pristine relative paths
+      """
+
+      for ix, k in enumerate(incoming):
+
+            if "ses-" in k:
+                  incoming[ix] = get_new_filename(k)
+
+            else:
+                  incoming[ix] = k
+
+      return incoming
+
+
+def update_sidecar(json_file):
+      """
+      Cleans up the IntendedFor list of a single fmap JSON file
+
+      Parameters
+            json_file: str | Relative path to a fieldmap or magnitude sidecar
+      """
+
+      # Open JSON as dictionary
+      with open(json_file) as incoming:
+            temp = json.load(incoming)
+
+      # Obtain clean list of relative paths
+      temp["IntendedFor"] = clean_intended_for(temp["IntendedFor"])
+
+      # Drop JSON files from IntendedFor field
+      temp["IntendedFor"] = [x for x in temp["IntendedFor"] if ".json" not in x]
+
+      # Add units to fieldmap files only
+      if "fieldmap.json" in json_file:
+            temp["Units"] = "Hz"
+
+      # Save file to its original filename
+      with open(json_file, "w") as outgoing:
+            json.dump(temp, outgoing, indent=5)
+
+
+def update_indented_for(path_to_sub_dir, files=None, executor=None):
+      """
+      Cleans up the IntendedFor list for each fmap JSON file (fieldmap and magnitude)
+
+      Parameters
+            path_to_sub_dir: str | Relative path to subject's BIDS data
+            files: list | Cached recursive listing of the subject (globbed if None)
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+      """
+
+      if files is None:
+            json_files = glob.glob(os.path.join(path_to_sub_dir, "fmap/**/*.json"), recursive=True)
+      else:
+            fmap_dir = os.path.join(path_to_sub_dir, "fmap") + os.sep
+            json_files = [x for x in files if x.startswith(fmap_dir) if x.endswith(".json")]
+
+      # Each sidecar is read and written on its own, so they can overlap
+      (executor or IOExecutor(depth=1)).map(update_sidecar, json_files)
+
+
+def run_single_subject(subject_id, bids_path, log, project=None):
+      """
+      Wrapper for all helper functions written above
+
+      Parameters
+            subject_id: str | Subject's identifier in BIDS project
+            bids_path: str | Relative path to top of BIDS project
+            log: I/O streamer | Text file opened outside this function
+            project: Project | Shared subject index (created here if None)
+
+      Returns
+            True if every step succeeded
+      """
+
+      if project is None:
+            project = Project(bids_path)
+
+      # E.g., ./bids/sub-12345
+      path_to_sub_dir = project.subject_path(subject_id)
+
+      # Catch typos
+      if not os.path.exists(path_to_sub_dir):
+            raise OSError(f"\n\nInvalid file path ... {path_to_sub_dir}")
+
+      log.write(f"\n\n** sub-{subject_id}\n\n")
+
+      success = True
+
+      try:
+            renames = rename_files(path_to_sub_dir,
+                                   files=project.get_files(subject_id),
+                                   executor=project.executor)
+            project.record_renames(subject_id, renames)
+            log.write("rename_files:\t\tSuccessful\n")
+      except Exception as e:
+            project.invalidate(subject_id)
+            success = False
+            log.write(f"rename_files:\t\t{e}\n")
+
+      try:
+            update_indented_for(path_to_sub_dir,
+                                files=project.get_files(subject_id),
+                                executor=project.executor)
+            log.write("update_intended_for:\tSuccessful\n")
+      except Exception as e:
+            success = False
+            log.write(f"update_intended_for:\t{e}\n")
+
+      return success
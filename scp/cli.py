@@ -0,0 +1,401 @@
+"""
+ABOUT THIS MODULE
+
+Command-line driver for every processing stage. Each subcommand
+mirrors one of the old scripts, and `pipeline` runs several stages
+back to back in one process so the interpreter, imports and subject
+index are only paid for once
+
+python3 -m scp hierarchy ../bids 12345
+python3 -m scp cleanup ../bids ALL
+python3 -m scp fmriprep-queue ../bids
+python3 -m scp t1-images ../bids 12345
+python3 -m scp survey 12345 PRE
+python3 -m scp pipeline ../bids ALL --stages hierarchy cleanup fmriprep-queue
+python3 -m scp watch ../bids --settle 300
+python3 -m scp pack ../bids ALL
+python3 -m scp intended-for ../bids ALL --dry-run
+python3 -m scp --io-depth 16 pipeline ../bids ALL
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import warnings
+warnings.filterwarnings('ignore')
+
+import argparse
+
+from scp.executor import IOExecutor, DEFAULT_DEPTH
+from scp.project import Project
+
+
+# --- Helpers
+def resolve_subjects(project, subject):
+      """
+      Expands a command-line subject argument
+
+      Parameters
+            project: Project | Shared subject index
+            subject: str | Subject identifier or ALL
+
+      Returns
+            List of subject IDs
+      """
+
+      if subject.upper() == "ALL":
+            return project.get_subjects()
+
+      return [subject]
+
+
+def progress(subjects):
+      """
+      Wraps a subject list in a progress bar when there is more than one
+      """
+
+      if len(subjects) > 1:
+            from tqdm import tqdm
+            return tqdm(subjects)
+
+      return subjects
+
+
+# Text file each stage writes its per-subject outcomes to
+STAGE_LOGS = {
+      "hierarchy": "directory_hierarchy.txt",
+      "cleanup": "session_cleanup.txt",
+      "intended-for": "intended_for.txt",
+      "pack": "derivatives_pack.txt",
+}
+
+
+def log_path(stage, log_prefix=""):
+      """
+      Local log file for a stage, e.g., ./session_cleanup.txt. Watch mode
+      passes a timestamp prefix so each batch keeps its own logs
+      """
+
+      return f"./{log_prefix}{STAGE_LOGS[stage]}"
+
+
+# --- Stages
+def run_hierarchy(project, subjects, log_prefix=""):
+      """
+      Flattens session subdirectories and strips ses- labels
+
+      Returns
+            Subjects with at least one failed step
+      """
+
+      from scp import hierarchy
+
+      failed = []
+
+      # Open text file to log any issues
+      with open(log_path("hierarchy", log_prefix), "w") as log:
+            for sub in progress(subjects):
+                  if not hierarchy.run_single_subject(sub,
+                                                      project.bids_root,
+                                                      log,
+                                                      project=project):
+                        failed.append(sub)
+
+      return failed
+
+
+def run_cleanup(project, subjects, log_prefix=""):
+      """
+      Renames session stragglers and tidies fmap IntendedFor fields
+
+      Returns
+            Subjects with at least one failed step
+      """
+
+      from scp import cleanup
+
+      failed = []
+
+      with open(log_path("cleanup", log_prefix), "w") as log:
+            for sub in progress(subjects):
+
+                  # Missing subject folders raise, keep going with the rest
+                  try:
+                        success = cleanup.run_single_subject(subject_id=sub,
+                                                             bids_path=project.bids_root,
+                                                             log=log,
+                                                             project=project)
+                  except OSError as e:
+                        log.write(f"\n\n** sub-{sub}\n\n{str(e).strip()}\n")
+                        success = False
+
+                  if not success:
+                        failed.append(sub)
+
+      return failed
+
+
+def run_fmriprep_queue(project, subjects=None, log_prefix=""):
+      """
+      Writes the list of subjects that still need fmriprep. The queue
+      is always derived from the whole cohort (no stage log)
+      """
+
+      from scp import fmriprep_queue
+
+      new_subjects = fmriprep_queue.derive_subs_to_process(bids_path=project.bids_root,
+                                                           project=project)
+
+      if len(new_subjects) > 0:
+            fmriprep_queue.write_locally(new_subjects=new_subjects)
+            print("\n** File successfully saved! **\n")
+      else:
+            print("\n** No subjects to preprocess! **\n")
+
+
+def run_t1_images(project, subjects, log_prefix=""):
+      """
+      Saves anatomical plots for each subject (no stage log)
+
+      Returns
+            Subjects whose plots could not be made
+      """
+
+      from scp import t1_images
+
+      suppress = len(subjects) > 1
+      failed = []
+
+      for sub in progress(subjects):
+            try:
+                  t1_images.run_single_subject(sub_id=sub,
+                                               bids_root=project.bids_root,
+                                               files=project.get_files(sub),
+                                               suppress=suppress)
+            except Exception as e:
+                  print(f"\n** sub-{sub}: no anatomical plots ({type(e).__name__}: {e}) **\n")
+                  failed.append(sub)
+
+      return failed
+
+
+def run_pack(project, subjects, threshold=None, exclude=(), log_prefix=""):
+      """
+      Packs small fmriprep outputs of finished subjects into one archive each
+      """
+
+      from scp import pack
+
+      if threshold is None:
+            threshold = pack.DEFAULT_THRESHOLD
+
+      # Extra patterns add to the analysis inputs that always stay loose
+      exclude = pack.DEFAULT_EXCLUDE + list(exclude)
+
+      with open(log_path("pack", log_prefix), "w") as log:
+            for sub in progress(subjects):
+                  pack.run_single_subject(subject_id=sub,
+                                          bids_path=project.bids_root,
+                                          log=log,
+                                          threshold=threshold,
+                                          exclude=exclude)
+
+
+def run_intended_for(project, subjects, dry_run=False, log_prefix=""):
+      """
+      Regenerates fmap IntendedFor fields from a cohort-wide run index
+
+      Returns
+            Subjects that were skipped (no func runs) or failed
+      """
+
+      from scp import intended_for
+
+      with open(log_path("intended-for", log_prefix), "w") as log:
+            updated, dangling, failed = intended_for.run_subjects(project.bids_root,
+                                                                  subjects,
+                                                                  log,
+                                                                  dry_run=dry_run,
+                                                                  executor=project.executor)
+
+      verb = "would be updated" if dry_run else "updated"
+      print(f"\n** {updated} sidecars {verb}, {dangling} dangling IntendedFor entries **\n")
+
+      return failed
+
+
+# Stages take (project, subjects, log_prefix="") and may return the subjects they failed on
+STAGES = {
+      "hierarchy": run_hierarchy,
+      "cleanup": run_cleanup,
+      "fmriprep-queue": run_fmriprep_queue,
+      "t1-images": run_t1_images,
+      "intended-for": run_intended_for,
+      "pack": run_pack,
+}
+
+# Same order as run_processing.sh
+DEFAULT_PIPELINE = ["hierarchy", "cleanup"]
+
+
+def run_pipeline(bids_root, subject, stages=DEFAULT_PIPELINE, project=None):
+      """
+      Runs several stages in order, sharing one Project between them
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            subject: str | Subject identifier or ALL
+            stages: list | Stage names from STAGES
+            project: Project | Shared subject index (created here if None)
+      """
+
+      for stage in stages:
+            if stage not in STAGES:
+                  raise ValueError(f"{stage} is not a valid stage ... pick from {list(STAGES)}")
+
+      if project is None:
+            project = Project(bids_root)
+
+      subjects = resolve_subjects(project, subject)
+
+      for stage in stages:
+            STAGES[stage](project, subjects)
+
+
+# --- Command line
+def build_parser():
+
+      parser = argparse.ArgumentParser(prog="scp",
+                                       description="SCP fMRI processing stages")
+      parser.add_argument("--io-depth", type=int, default=DEFAULT_DEPTH,
+                          help="File operations kept in flight at once (1 = sequential)")
+      commands = parser.add_subparsers(dest="command", required=True)
+
+      for name in ["hierarchy", "cleanup", "t1-images"]:
+            stage = commands.add_parser(name)
+            stage.add_argument("bids_root", help="Relative path to BIDS project")
+            stage.add_argument("subject", help="Subject identifier or ALL")
+
+      queue = commands.add_parser("fmriprep-queue")
+      queue.add_argument("bids_root", help="Relative path to BIDS project")
+
+      survey = commands.add_parser("survey")
+      survey.add_argument("pid", nargs="?", help="Participant identifier")
+      survey.add_argument("scan", nargs="?", help="PRE or POST")
+
+      pipeline = commands.add_parser("pipeline")
+      pipeline.add_argument("bids_root", help="Relative path to BIDS project")
+      pipeline.add_argument("subject", help="Subject identifier or ALL")
+      pipeline.add_argument("--stages", nargs="+", choices=list(STAGES),
+                            default=DEFAULT_PIPELINE,
+                            help="Stages to run, in order")
+
+      packer = commands.add_parser("pack")
+      packer.add_argument("bids_root", help="Relative path to BIDS project")
+      packer.add_argument("subject", help="Subject identifier or ALL")
+      packer.add_argument("--threshold", type=int, default=None,
+                          help="Files this many bytes or larger stay on disk")
+      packer.add_argument("--exclude", nargs="+", default=[],
+                          help="Extra file name patterns to keep on disk, e.g., '*_events.tsv'")
+
+      intended = commands.add_parser("intended-for")
+      intended.add_argument("bids_root", help="Relative path to BIDS project")
+      intended.add_argument("subject", help="Subject identifier or ALL")
+      intended.add_argument("--dry-run", action="store_true",
+                            help="Report differences without writing sidecars")
+
+      unpacker = commands.add_parser("unpack")
+      unpacker.add_argument("bids_root", help="Relative path to BIDS project")
+      unpacker.add_argument("subject", help="Subject identifier or ALL")
+
+      watch = commands.add_parser("watch")
+      watch.add_argument("bids_root", help="Relative path to BIDS project")
+      watch.add_argument("--interval", type=float, default=30,
+                         help="Seconds between checks for new subjects")
+      watch.add_argument("--settle", type=float, default=300,
+                         help="Seconds a subject folder must stay unchanged")
+      watch.add_argument("--stages", nargs="+", choices=list(STAGES),
+                         default=DEFAULT_PIPELINE,
+                         help="Stages to run on each new subject, in order")
+      watch.add_argument("--job-script", default=None,
+                         help="Submit new subjects with this Job-Script.sh")
+      watch.add_argument("--include-existing", action="store_true",
+                         help="Treat subjects without fmriprep output as new")
+      watch.add_argument("--poll", action="store_true", default=None,
+                         help="Force mtime polling instead of inotify")
+
+      return parser
+
+
+def main(argv=None):
+
+      args = build_parser().parse_args(argv)
+
+      with IOExecutor(depth=args.io_depth) as executor:
+            run_command(args, executor)
+
+
+def run_command(args, executor):
+      """
+      Dispatches a parsed command line, sharing one I/O pool across stages
+      """
+
+      if args.command == "survey":
+            from scp import survey
+
+            PID, SESSION = args.pid, args.scan
+
+            if PID is None or SESSION is None:
+                  PID = input("\nSubject ID:\t\t\t")
+                  SESSION = input("Scan session (Pre or Post):\t")
+
+            survey.open_survey(PID=PID, SCAN=SESSION)
+
+      elif args.command == "fmriprep-queue":
+            run_fmriprep_queue(Project(args.bids_root, executor=executor))
+
+      elif args.command == "pack":
+            project = Project(args.bids_root, executor=executor)
+            run_pack(project,
+                     resolve_subjects(project, args.subject),
+                     threshold=args.threshold,
+                     exclude=args.exclude)
+
+      elif args.command == "intended-for":
+            project = Project(args.bids_root, executor=executor)
+            run_intended_for(project,
+                             resolve_subjects(project, args.subject),
+                             dry_run=args.dry_run)
+
+      elif args.command == "unpack":
+            from scp import pack
+
+            project = Project(args.bids_root, executor=executor)
+
+            for sub in resolve_subjects(project, args.subject):
+                  count = pack.unpack_subject(pack.fmriprep_path(args.bids_root), sub)
+                  print(f"sub-{sub}:\t{count} files restored")
+
+      elif args.command == "watch":
+            from scp.watch import Watcher
+
+            Watcher(args.bids_root,
+                    settle=args.settle,
+                    interval=args.interval,
+                    stages=args.stages,
+                    job_script=args.job_script,
+                    include_existing=args.include_existing,
+                    poll=args.poll,
+                    executor=executor).run()
+
+      elif args.command == "pipeline":
+            run_pipeline(args.bids_root, args.subject, stages=args.stages,
+                         project=Project(args.bids_root, executor=executor))
+
+      else:
+            run_pipeline(args.bids_root, args.subject, stages=[args.command],
+                         project=Project(args.bids_root, executor=executor))
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,90 @@
+"""
+ABOUT THIS MODULE
+
+We're running fmriprep on a rolling basis as
+we obtain new participant data. This stage identifies
+subjects that have already been preprocessed, and does NOT
+include them in the preprocessing script
+
+Ian Richard Ferguson | SSNL
+"""
+
+# --- Imports
+import os
+from datetime import datetime
+
+from scp.project import Project
+
+
+# --- Helpers
+def get_preprocessed(path_to_prep):
+    """
+    Parameters
+        path_to_prep: str | Relative path to fmriprep output directory
+
+    Returns
+        List of preprocessed subjects
+    """
+
+    if not os.path.isdir(path_to_prep):
+        return []
+
+    return [x.split('sub-')[1] for x in os.listdir(path_to_prep)
+
+            # Subject output folders only
+            if x.startswith("sub-")
+
+            # We want directories only
+            if os.path.isdir(os.path.join(path_to_prep, x))
+            
+            # Redundant but excludes output HTML summaries
+            if ".html" not in x]
+
+
+def derive_subs_to_process(bids_path, project=None):
+    """
+    Compare all subjects with those already preprocessed
+
+    Parameters
+        bids_path: str | Relative path to BIDS project (top level)
+        project: Project | Shared subject index (created here if None)
+
+    Returns
+        List of subjects that require preprocessing
+    """
+
+    if project is None:
+        project = Project(bids_path)
+
+    all_subjects = project.get_subjects()
+    
+    path_to_fmriprep = os.path.join(bids_path, "derivatives/fmriprep")
+    preprocessed = get_preprocessed(path_to_prep=path_to_fmriprep)
+
+    return [x for x in all_subjects if x not in preprocessed]
+
+
+def write_locally(new_subjects, filename=None):
+    """
+    This function writes a local text file optimized to copy
+    and paste directly into the fmriprep script
+
+    Parameters
+        new_subjects: list | List of subjects that have not been preprocessed
+        filename: str | Output file (defaults to today's date)
+
+    Returns
+        Name of the text file that was written
+    """
+
+    formatted = " ".join(new_subjects)
+
+    if filename is None:
+        today = datetime.today().strftime("%Y_%b_%d")
+        filename = f"{today}_fmriprep.txt"
+
+    with open(filename, "w") as log:
+        log.write("INSTRUCTIONS\nPaste the output below directly into your Job Script\n\n")
+        log.write(f"({formatted})")
+
+    return filename
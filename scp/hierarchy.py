@@ -0,0 +1,201 @@
+"""
+ABOUT THIS MODULE
+
+We have single-session data acqusistion in this project; as a 
+result, we do not need the BIDS session label included in our
+data at this time. This stage iteratively moves and renames
+all files in order to fit our specs
+
+This stage performs the following operations:
+    * Creates anat/func/fmap directories if they do not exist
+    * Moves all files from the ses- subdirectory to the higher-level BIDS directory
+    * Rename each file to strip out the ses- tag
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import os, shutil, glob
+
+from scp.executor import IOExecutor
+from scp.project import Project
+
+
+# --- Helpers
+def make_subdir(path):
+    """
+    Creates a single directory if it doesn't exist yet
+    """
+
+    if not os.path.exists(path):
+        os.mkdir(path)
+
+
+def create_correct_subdirs(path_to_sub_id, executor=None):
+    """
+    This function sets the table for us to move our nested 
+    files up one level
+
+    Parameters
+        path_to_sub_id: str | Relative path to subject BIDS data
+        executor: IOExecutor | I/O pool for independent operations (sequential if None)
+    """
+
+    executor = executor or IOExecutor(depth=1)
+
+    # If the subject doesn't have a subdirectory, we'll create it
+    executor.map(make_subdir,
+                 [os.path.join(path_to_sub_id, k) for k in ["anat", "fmap", "func"]])
+
+
+def get_session_id(x):
+      """
+      This function isolates the session ID if it exists
+
+      Parameters
+            x: str | Any incoming relative path
+
+      Returns
+            Clean string with ses- tag removed
+      """
+
+      if "ses-" in x:
+            return [k.strip() for k in x.split("_") if "ses" in k][0]
+
+      return None
+
+
+def move_files_up(path_to_sub_id, executor=None):
+      """
+      This function recursively loops through our subdirectories
+      and moves files up from session subdirectories to the highest level
+
+      Parameters
+            path_to_sub_id: str | Relative path to subject BIDS data
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+
+      Returns
+            True if a session subdirectory was flattened, else False
+      """
+
+      # Session ID, e.g., ses-12345
+      try:
+            session_id = [x for x in os.listdir(path_to_sub_id) if "ses-" in x][0]
+            directory_formatted = False
+      except:
+            directory_formatted = True
+
+      # Directory has not been re-formatted, we'll do that here
+      if not directory_formatted:
+            executor = executor or IOExecutor(depth=1)
+            subdirs = ["anat", "fmap", "func"]
+
+            # Nested subdirs
+            olds = [os.path.join(path_to_sub_id, session_id, subdir) for subdir in subdirs]
+
+            # List all three at once, targets already exist from create_correct_subdirs
+            listings = executor.map(os.listdir, olds)
+
+            # Move all files up out of sesion subdirectory
+            moves = [(os.path.join(old, file), os.path.join(path_to_sub_id, subdir))
+                     for subdir, old, files in zip(subdirs, olds, listings)
+                     for file in files]
+
+            executor.map(lambda move: shutil.move(*move), moves)
+
+            # Removes old directory, which should be empty
+            if session_id is not None:
+                  shutil.rmtree(os.path.join(path_to_sub_id, session_id))
+
+      return not directory_formatted
+
+
+def rename_all_files(path_to_sub_id, files=None, executor=None):
+      """
+      This function iteratively loops through all files
+      and strips out the session ID if it exists
+
+      Parameters
+            path_to_sub_id: str | Relative path to subject BIDS data
+            files: list | Cached recursive listing of the subject (globbed if None)
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+
+      Returns
+            List of (old, new) renames in the order they were applied
+      """
+
+      if files is None:
+            files = glob.glob(os.path.join(path_to_sub_id, "**/*"), recursive=True)
+
+      renames = []
+
+      for file in files:
+
+            session_id = get_session_id(file)
+
+            if session_id is not None:
+
+                  new_filename = file.replace(f"{session_id}_", "")
+
+                  renames.append((file, new_filename))
+
+      (executor or IOExecutor(depth=1)).rename_all(renames)
+
+      return renames
+
+
+def run_single_subject(subject_id, bids_path, log, project=None):
+      """
+      Loops through our functions above and applies them to a given subject
+
+      Parameters
+            subject_id: str | Subject's identifier in the BIDS project
+            bids_path: str | Relative path to BIDS project
+            log: I/O stream | Text file opened outside of this function
+            project: Project | Shared subject index (created here if None)
+
+      Returns
+            True if every step succeeded
+      """
+
+      if project is None:
+            project = Project(bids_path)
+
+      # Relative path to subject's BIDS data
+      filepath = project.subject_path(subject_id)
+      log.write(f"\n** sub-{subject_id} **\n")
+
+      success = True
+
+      # -- Create new subdirectories
+      try:
+            create_correct_subdirs(filepath, executor=project.executor)
+            log.write("Created subdirs:\t\tSuccessful\n")
+      except Exception as e:
+            success = False
+            log.write(f"Created subdirs:\t\t{e}\n")
+
+      # -- Move files up from session subdirectory
+      try:
+            move_files_up(filepath, executor=project.executor)
+            log.write("Files moved up:\t\tSuccessful\n")
+      except Exception as e:
+            success = False
+            log.write(f"Files moved up:\t\t{e}\n")
+
+      # Layout changed underneath any cached listing
+      project.invalidate(subject_id)
+
+      # -- Strip session identifier from all files
+      try:
+            renames = rename_all_files(filepath,
+                                       files=project.get_files(subject_id),
+                                       executor=project.executor)
+            project.record_renames(subject_id, renames)
+            log.write("Renamed files:\t\tSuccessful\n")
+      except Exception as e:
+            project.invalidate(subject_id)
+            success = False
+            log.write(f"Renamed files:\t\t{e}\n")
+
+      return success
@@ -0,0 +1,218 @@
+"""
+ABOUT THIS MODULE
+
+cleanup.clean_intended_for only string-patches ses- fragments, so
+it never notices an IntendedFor entry that points at a run we
+dropped or renamed (e.g., the stressbuffer_run-1_v2 relabel in
+populate.py). This stage rebuilds IntendedFor from what is on disk:
+
+      * Scans every subject's func/ and fmap/ folder once to build a run index
+      * Sets each fmap sidecar's IntendedFor to all of the subject's BOLD runs
+        (single session, one spiral fieldmap covering the whole scan)
+      * Writes only the sidecars whose IntendedFor actually changed
+      * Reports entries that pointed at files that no longer exist
+
+python3 -m scp intended-for ../bids ALL --dry-run
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import os, json
+
+from scp.executor import IOExecutor
+
+
+BOLD_SUFFIXES = ("_bold.nii.gz", "_bold.nii")
+
+
+# --- Helpers
+def list_names(path):
+      """
+      File names in a directory, or an empty list if it doesn't exist
+      """
+
+      try:
+            with os.scandir(path) as entries:
+                  return sorted(x.name for x in entries if x.is_file())
+      except FileNotFoundError:
+            return []
+
+
+def build_run_index(bids_root, subjects, executor=None):
+      """
+      Single pass over the cohort collecting func runs and fmap sidecars
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            subjects: list | Subject IDs to index
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+
+      Returns
+            Dictionary of subject ID -> {"func": [names], "fmap": [names]}
+      """
+
+      folders = [os.path.join(bids_root, f"sub-{sub}", k)
+                 for sub in subjects
+                 for k in ["func", "fmap"]]
+
+      listings = (executor or IOExecutor(depth=1)).map(list_names, folders)
+
+      return {sub: {"func": listings[2 * ix], "fmap": listings[2 * ix + 1]}
+              for ix, sub in enumerate(subjects)}
+
+
+def expected_intended_for(runs):
+      """
+      IntendedFor list for a subject, relative to the subject folder
+
+      Parameters
+            runs: dict | One subject's entry from build_run_index
+
+      Returns
+            Sorted list like ["func/sub-12345_task-faces_run-1_bold.nii.gz", ...]
+      """
+
+      return [f"func/{x}" for x in runs["func"] if x.endswith(BOLD_SUFFIXES)]
+
+
+def find_dangling(intended_for, runs, path_to_sub_dir):
+      """
+      Entries that don't point at a file that exists
+
+      Parameters
+            intended_for: list | Current IntendedFor field
+            runs: dict | One subject's entry from build_run_index
+            path_to_sub_dir: str | Relative path to subject's BIDS data
+
+      Returns
+            List of dangling entries
+      """
+
+      on_disk = {f"func/{x}" for x in runs["func"]}
+      dangling = []
+
+      for entry in intended_for:
+
+            # Anything outside func/ wasn't indexed, so check it directly
+            if entry in on_disk:
+                  continue
+            if not entry.startswith("func/") and os.path.exists(os.path.join(path_to_sub_dir, entry)):
+                  continue
+
+            dangling.append(entry)
+
+      return dangling
+
+
+def regenerate_subject(bids_root, subject_id, runs, dry_run=False):
+      """
+      Brings every fmap sidecar for one subject in line with the run index
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            subject_id: str | Subject's identifier in BIDS project
+            runs: dict | The subject's entry from build_run_index
+            dry_run: Boolean | if True, nothing is written
+
+      Returns
+            List of (sidecar path, updated, dangling entries) per fmap sidecar.
+            Empty if the subject has no BOLD runs on disk (e.g., func/ is still
+            nested under ses-), in which case nothing is touched
+      """
+
+      path_to_sub_dir = os.path.join(bids_root, f"sub-{subject_id}")
+      expected = expected_intended_for(runs)
+      results = []
+
+      # Never swap a real IntendedFor for an empty one
+      if not expected:
+            return results
+
+      for name in runs["fmap"]:
+
+            if not name.endswith(".json"):
+                  continue
+
+            json_file = os.path.join(path_to_sub_dir, "fmap", name)
+
+            with open(json_file) as incoming:
+                  temp = json.load(incoming)
+
+            current = temp.get("IntendedFor", [])
+
+            # BIDS allows a bare string for a single target
+            if isinstance(current, str):
+                  current = [current]
+
+            dangling = find_dangling(current, runs, path_to_sub_dir)
+            updated = current != expected
+
+            if updated and not dry_run:
+                  temp["IntendedFor"] = expected
+
+                  with open(json_file, "w") as outgoing:
+                        json.dump(temp, outgoing, indent=5)
+
+            results.append((json_file, updated, dangling))
+
+      return results
+
+
+def run_subjects(bids_root, subjects, log, dry_run=False, executor=None):
+      """
+      Indexes the cohort once and regenerates every subject's sidecars
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            subjects: list | Subject IDs to process
+            log: I/O stream | Text file opened outside of this function
+            dry_run: Boolean | if True, report differences without writing
+            executor: IOExecutor | I/O pool for independent operations (sequential if None)
+
+      Returns
+            Tuple of (sidecars updated, dangling entries found, subjects skipped or failed)
+      """
+
+      executor = executor or IOExecutor(depth=1)
+      index = build_run_index(bids_root, subjects, executor=executor)
+
+      def regenerate(sub):
+            # Errors are logged per subject rather than stopping the batch
+            try:
+                  return regenerate_subject(bids_root, sub, index[sub], dry_run=dry_run)
+            except Exception as e:
+                  return e
+
+      outcomes = executor.map(regenerate, subjects)
+      n_updated, n_dangling, failed = 0, 0, []
+
+      # Logging stays on this thread, in subject order
+      for sub, results in zip(subjects, outcomes):
+            log.write(f"\n** sub-{sub} **\n")
+
+            if not expected_intended_for(index[sub]):
+                  log.write("Run index:\t\tNo func runs found, sidecars left alone\n")
+                  failed.append(sub)
+                  continue
+
+            if isinstance(results, Exception):
+                  log.write(f"IntendedFor:\t\t{results}\n")
+                  failed.append(sub)
+                  continue
+
+            for json_file, updated, dangling in results:
+                  status = "Updated" if updated else "Unchanged"
+
+                  if updated and dry_run:
+                        status = "Would update"
+
+                  log.write(f"{os.path.basename(json_file)}:\t{status}\n")
+
+                  for entry in dangling:
+                        log.write(f"\tDangling:\t{entry}\n")
+
+                  n_updated += int(updated)
+                  n_dangling += len(dangling)
+
+      return (n_updated, n_dangling, failed)
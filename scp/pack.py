@@ -0,0 +1,418 @@
+"""
+ABOUT THIS MODULE
+
+Every fmriprep subject leaves thousands of small files behind
+(figures, JSON sidecars, transforms, HTML pieces). On Oak these
+eat into our group's inode quota and make listing and copying
+derivatives slow. This stage packs the small files of finished
+subjects into one zip archive per subject and leaves the large
+NIfTIs where fmriprep put them
+
+      * A subject is finished once fmriprep has written sub-<id>.html
+      * Non-NIfTI files under the size threshold are packed, except the
+        inputs GLM Express finds through BIDSLayout: sidecars of the NIfTIs
+        that stay on disk and the confounds files
+      * The archive is verified before any loose file is deleted
+      * Members are named relative to derivatives/fmriprep, e.g.,
+        sub-12345/figures/sub-12345_desc-summary_T1w.html
+
+Downstream code reads packed files through SubjectArchive without
+unpacking anything. `python3 -m scp unpack` restores the loose files
+if you need to browse an HTML report
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import os, zipfile
+from fnmatch import fnmatch
+
+
+# Anything this size or larger stays on disk
+DEFAULT_THRESHOLD = 1024 * 1024
+
+NIFTI_EXTENSIONS = (".nii", ".nii.gz")
+
+# Analysis inputs that always stay loose (matched against file names)
+DEFAULT_EXCLUDE = ["*_desc-confounds_timeseries.tsv", "*_desc-confounds_timeseries.json",
+                   "*_desc-confounds_regressors.tsv", "*_desc-confounds_regressors.json"]
+
+
+# --- Helpers
+def fmriprep_path(bids_path):
+      """
+      Relative path to fmriprep output inside the BIDS project
+      """
+
+      return os.path.join(bids_path, "derivatives/fmriprep")
+
+
+def archive_path(path_to_prep, subject_id):
+      """
+      Where a subject's archive lives, e.g., fmriprep/sub-12345/sub-12345_smallfiles.zip
+      """
+
+      return os.path.join(path_to_prep, f"sub-{subject_id}", f"sub-{subject_id}_smallfiles.zip")
+
+
+def staging_path(path_to_prep, subject_id):
+      """
+      Where an archive is written before it replaces the real one. This
+      sits outside the subject folder so an interrupted run never leaves
+      a half-written zip where find_small_files would pick it up
+      """
+
+      return os.path.join(path_to_prep, f".sub-{subject_id}_smallfiles.zip.tmp")
+
+
+def nifti_stem(name):
+      """
+      File name without its NIfTI or sidecar extension
+      """
+
+      for ext in NIFTI_EXTENSIONS + (".json",):
+            if name.endswith(ext):
+                  return name[:-len(ext)]
+
+      return name
+
+
+def is_finished(path_to_prep, subject_id):
+      """
+      fmriprep writes the subject HTML report last, so its presence
+      (loose or already packed) means the subject is done
+      """
+
+      return (os.path.exists(os.path.join(path_to_prep, f"sub-{subject_id}.html"))
+              or os.path.exists(archive_path(path_to_prep, subject_id)))
+
+
+def find_small_files(path_to_prep, subject_id, threshold=DEFAULT_THRESHOLD,
+                     exclude=DEFAULT_EXCLUDE):
+      """
+      Collects the files that should go into a subject's archive
+
+      Parameters
+            path_to_prep: str | Relative path to fmriprep output directory
+            subject_id: str | Subject's identifier in BIDS project
+            threshold: int | Files this many bytes or larger are left alone
+            exclude: list | File name patterns that always stay on disk
+
+      Returns
+            List of (path on disk, member name) pairs
+      """
+
+      packed = archive_path(path_to_prep, subject_id)
+
+      # Older runs staged next to the archive, never pack a leftover
+      skip = {packed, packed + ".tmp"}
+      found = []
+
+      # Top-level subject report sits next to the subject folder
+      report = os.path.join(path_to_prep, f"sub-{subject_id}.html")
+      if os.path.isfile(report):
+            found.append((report, f"sub-{subject_id}.html"))
+
+      for root, dirs, files in os.walk(os.path.join(path_to_prep, f"sub-{subject_id}")):
+            dirs.sort()
+
+            # BIDSLayout needs the sidecar of every NIfTI it indexes
+            nifti_stems = {nifti_stem(x) for x in files if x.endswith(NIFTI_EXTENSIONS)}
+
+            for name in sorted(files):
+                  path = os.path.join(root, name)
+
+                  if path in skip:
+                        continue
+
+                  # NIfTIs are what people open directly, keep them loose
+                  if name.endswith(NIFTI_EXTENSIONS):
+                        continue
+
+                  if name.endswith(".json") and nifti_stem(name) in nifti_stems:
+                        continue
+
+                  if any(fnmatch(name, pattern) for pattern in exclude):
+                        continue
+
+                  if os.path.islink(path) or os.path.getsize(path) >= threshold:
+                        continue
+
+                  found.append((path, os.path.relpath(path, path_to_prep).replace(os.sep, "/")))
+
+      return found
+
+
+def write_archive(path_to_prep, subject_id, members):
+      """
+      Writes (or extends) a subject's archive and checks it before
+      anything gets deleted
+
+      Parameters
+            path_to_prep: str | Relative path to fmriprep output directory
+            subject_id: str | Subject's identifier in BIDS project
+            members: list | (path on disk, member name) pairs
+      """
+
+      target = archive_path(path_to_prep, subject_id)
+      staging = staging_path(path_to_prep, subject_id)
+
+      # Extending an existing archive goes through a copy so a crash
+      # halfway never leaves us with a damaged original
+      with zipfile.ZipFile(staging, "w", compression=zipfile.ZIP_DEFLATED) as outgoing:
+
+            if os.path.exists(target):
+                  with zipfile.ZipFile(target) as existing:
+                        replaced = {name for _, name in members}
+
+                        for info in existing.infolist():
+                              if info.filename not in replaced:
+                                    outgoing.writestr(info, existing.read(info))
+
+            for path, name in members:
+                  outgoing.write(path, arcname=name)
+
+      # Read every member back so a bad CRC stops us before deleting
+      with zipfile.ZipFile(staging) as check:
+            bad = check.testzip()
+            sizes = {info.filename: info.file_size for info in check.infolist()}
+
+      if bad is not None:
+            os.remove(staging)
+            raise OSError(f"Archive failed verification at {bad}")
+
+      for path, name in members:
+            if sizes.get(name) != os.path.getsize(path):
+                  os.remove(staging)
+                  raise OSError(f"Archive is missing {name}")
+
+      os.replace(staging, target)
+
+      # Leftover from an interrupted run that staged inside the subject folder
+      if os.path.exists(target + ".tmp"):
+            os.remove(target + ".tmp")
+
+
+def remove_packed(path_to_prep, subject_id, members):
+      """
+      Deletes loose files that are now in the archive, then any
+      directories that were left empty
+      """
+
+      for path, _ in members:
+            os.remove(path)
+
+      subject_dir = os.path.join(path_to_prep, f"sub-{subject_id}")
+
+      for root, dirs, files in os.walk(subject_dir, topdown=False):
+            if root != subject_dir and not os.listdir(root):
+                  os.rmdir(root)
+
+
+def pack_subject(path_to_prep, subject_id, threshold=DEFAULT_THRESHOLD,
+                 exclude=DEFAULT_EXCLUDE):
+      """
+      Packs a finished subject's small files
+
+      Parameters
+            path_to_prep: str | Relative path to fmriprep output directory
+            subject_id: str | Subject's identifier in BIDS project
+            threshold: int | Files this many bytes or larger are left alone
+            exclude: list | File name patterns that always stay on disk
+
+      Returns
+            Tuple of (number of files packed, bytes packed)
+      """
+
+      if not is_finished(path_to_prep, subject_id):
+            raise OSError(f"sub-{subject_id} has not finished fmriprep")
+
+      members = find_small_files(path_to_prep, subject_id,
+                                 threshold=threshold, exclude=exclude)
+
+      if not members:
+            return (0, 0)
+
+      size = sum(os.path.getsize(path) for path, _ in members)
+
+      write_archive(path_to_prep, subject_id, members)
+      remove_packed(path_to_prep, subject_id, members)
+
+      return (len(members), size)
+
+
+def unpack_subject(path_to_prep, subject_id):
+      """
+      Restores every packed file to its original location and
+      removes the archive
+
+      Returns
+            Number of files restored
+      """
+
+      target = archive_path(path_to_prep, subject_id)
+
+      if not os.path.exists(target):
+            return 0
+
+      with zipfile.ZipFile(target) as incoming:
+            names = incoming.namelist()
+            incoming.extractall(path_to_prep)
+
+      os.remove(target)
+
+      return len(names)
+
+
+def run_single_subject(subject_id, bids_path, log, threshold=DEFAULT_THRESHOLD,
+                       exclude=DEFAULT_EXCLUDE):
+      """
+      Packs one subject and logs the outcome
+
+      Parameters
+            subject_id: str | Subject's identifier in BIDS project
+            bids_path: str | Relative path to top of BIDS project
+            log: I/O stream | Text file opened outside of this function
+            threshold: int | Files this many bytes or larger are left alone
+            exclude: list | File name patterns that always stay on disk
+      """
+
+      path_to_prep = fmriprep_path(bids_path)
+      log.write(f"\n** sub-{subject_id} **\n")
+
+      if not is_finished(path_to_prep, subject_id):
+            log.write("Packed files:\t\tSkipped, fmriprep not finished\n")
+            return
+
+      try:
+            count, size = pack_subject(path_to_prep, subject_id,
+                                       threshold=threshold, exclude=exclude)
+            log.write(f"Packed files:\t\t{count} files, {size / 1024 / 1024:.1f} MB\n")
+      except Exception as e:
+            log.write(f"Packed files:\t\t{e}\n")
+
+
+# --- Read API
+class SubjectArchive:
+      """
+      Read-only view of one subject's fmriprep output that looks in the
+      archive first and falls back to loose files, so callers don't need
+      to know whether a subject has been packed
+
+      Parameters
+            path_to_prep: str | Relative path to fmriprep output directory
+            subject_id: str | Subject's identifier in BIDS project
+
+      Usage
+            with SubjectArchive(prep, "12345") as sub:
+                  summary = sub.read("sub-12345/figures/sub-12345_desc-summary_T1w.html")
+      """
+
+      def __init__(self, path_to_prep, subject_id):
+            self.path_to_prep = path_to_prep
+            self.subject_id = subject_id
+
+            target = archive_path(path_to_prep, subject_id)
+
+            # The zip central directory is our index, read once on open
+            self._zip = zipfile.ZipFile(target) if os.path.exists(target) else None
+
+
+      def __enter__(self):
+            return self
+
+
+      def __exit__(self, *args):
+            self.close()
+
+
+      def close(self):
+            if self._zip is not None:
+                  self._zip.close()
+                  self._zip = None
+
+
+      def packed_names(self):
+            """
+            Member names stored in the archive
+            """
+
+            return [] if self._zip is None else self._zip.namelist()
+
+
+      def names(self):
+            """
+            Every file belonging to the subject, packed or loose, named
+            relative to derivatives/fmriprep
+            """
+
+            found = set(self.packed_names())
+            report = f"sub-{self.subject_id}.html"
+
+            if os.path.isfile(os.path.join(self.path_to_prep, report)):
+                  found.add(report)
+
+            packed = archive_path(self.path_to_prep, self.subject_id)
+
+            for root, dirs, files in os.walk(os.path.join(self.path_to_prep, f"sub-{self.subject_id}")):
+                  for name in files:
+                        path = os.path.join(root, name)
+                        if path != packed:
+                              found.add(os.path.relpath(path, self.path_to_prep).replace(os.sep, "/"))
+
+            return sorted(found)
+
+
+      def is_packed(self, name):
+            """
+            True if a member is stored in the archive
+            """
+
+            if self._zip is None:
+                  return False
+
+            try:
+                  self._zip.getinfo(name)
+            except KeyError:
+                  return False
+
+            return True
+
+
+      def exists(self, name):
+            """
+            True if a member is available either packed or on disk
+            """
+
+            if self.is_packed(name):
+                  return True
+
+            return os.path.isfile(os.path.join(self.path_to_prep, name))
+
+
+      def open(self, name):
+            """
+            Binary file object for a member, without extracting anything
+
+            Parameters
+                  name: str | Path relative to derivatives/fmriprep
+            """
+
+            if self.is_packed(name):
+                  return self._zip.open(name)
+
+            path = os.path.join(self.path_to_prep, name)
+
+            if not os.path.isfile(path):
+                  raise FileNotFoundError(f"{name} is not in the archive or on disk")
+
+            return open(path, "rb")
+
+
+      def read(self, name):
+            """
+            Member contents as bytes
+            """
+
+            with self.open(name) as incoming:
+                  return incoming.read()
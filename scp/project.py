@@ -0,0 +1,116 @@
+"""
+ABOUT THIS MODULE
+
+Every stage needs the same two things: the list of subjects in
+the BIDS project and the files that belong to each subject. Building
+a BIDSLayout and globbing a subject directory are the slowest parts
+of a stage on Oak, so a Project object does both once and hands the
+results to every stage that runs in the same process
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import os, glob
+
+from scp.executor import IOExecutor
+
+
+# --- Objects
+class Project:
+      """
+      Cached view of a BIDS project
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            executor: IOExecutor | Shared I/O pool (sequential if None)
+      """
+
+      def __init__(self, bids_root, executor=None):
+            self.bids_root = bids_root
+            self.executor = executor or IOExecutor(depth=1)
+            self._subjects = None
+            self._files = {}
+
+
+      def get_subjects(self):
+            """
+            Subject identifiers in the BIDS project (without the sub- prefix)
+
+            Returns
+                  Sorted list of subject IDs
+            """
+
+            if self._subjects is None:
+                  self._subjects = sorted(
+                        x.split("sub-", 1)[1] for x in os.listdir(self.bids_root)
+                        if x.startswith("sub-")
+                        if os.path.isdir(os.path.join(self.bids_root, x)))
+
+            return list(self._subjects)
+
+
+      def subject_path(self, subject_id):
+            """
+            Relative path to a subject's BIDS data, e.g., ./bids/sub-12345
+            """
+
+            return os.path.join(self.bids_root, f"sub-{subject_id}")
+
+
+      def get_files(self, subject_id):
+            """
+            Recursive listing of a subject's directory, cached per subject
+
+            Parameters
+                  subject_id: str | Subject's identifier in BIDS project
+
+            Returns
+                  List of relative paths (same order as a recursive glob)
+            """
+
+            if subject_id not in self._files:
+                  self._files[subject_id] = glob.glob(
+                        os.path.join(self.subject_path(subject_id), "**/*"), recursive=True)
+
+            return list(self._files[subject_id])
+
+
+      def record_renames(self, subject_id, renames):
+            """
+            Applies (old, new) renames to the cached listing so the next
+            stage does not need to glob the subject directory again
+
+            Parameters
+                  subject_id: str | Subject's identifier in BIDS project
+                  renames: list | (old, new) path pairs in the order they happened
+            """
+
+            if subject_id not in self._files or not renames:
+                  return
+
+            listing = self._files[subject_id]
+
+            for old, new in renames:
+                  for ix, k in enumerate(listing):
+
+                        # Renamed file or children of a renamed directory
+                        if k == old:
+                              listing[ix] = new
+                        elif k.startswith(old + os.sep):
+                              listing[ix] = new + k[len(old):]
+
+
+      def invalidate(self, subject_id=None):
+            """
+            Drops cached listings after a stage moves files around
+
+            Parameters
+                  subject_id: str | Subject to forget, or None to forget everything
+            """
+
+            if subject_id is None:
+                  self._subjects = None
+                  self._files = {}
+            else:
+                  self._files.pop(subject_id, None)
@@ -0,0 +1,114 @@
+"""
+About this Module
+
+We're giving subjects plots of their anatomical
+images as a part of their compensation. This stage
+creates a subject-specific ouput folder and saves a local
+mosaic and ortho plot of their T1w image
+
+IRF | SSNL
+"""
+
+# --- Imports
+import os, pathlib, glob
+import nilearn.plotting as nip
+
+
+# --- Functions
+def make_output_file(sub_id, suppress=False):
+      """
+      Creates a subject specific output directory
+
+      Parameters
+            sub_id: str | Subject ID from BIDS project, e.g., 10245
+            suppress: Boolean | if True, print statements are suppressed
+      """
+
+      # Path to output
+      output_path = os.path.join(f'./participant_images/sub-{sub_id}')
+
+      if not os.path.exists(output_path):
+
+            if not suppress:
+                  print('\n== Creating subject output directory ==')
+
+            pathlib.Path(output_path).mkdir(exist_ok=True, parents=True)
+
+
+def isolate_anat_path(sub_id, bids_root, files=None):
+      """
+      Finds relative path to the participant's T1w anatomical scan
+
+      Parameters
+            sub_id: str | Subject ID from BIDS project, e.g., 10245
+            bids_root: str | Relative path to top of BIDS project
+            files: list | Cached recursive listing of the subject (globbed if None)
+
+      Returns
+            Single-string relative path to the participant's T1w file
+      """
+
+      if files is None:
+            subject_path = os.path.join(bids_root, f'sub-{sub_id}')
+            files = glob.glob(os.path.join(subject_path, '**/*.nii.gz'), recursive=True)
+
+      return [x for x in files if x.endswith('.nii.gz') if 'T1w' in x][0]
+
+
+def build_plots(sub_id, path_to_T1, suppress=False):
+      """
+      Creates plots of the participant's T1w anatomical scan
+
+      Parameters
+            sub_id: str | Subject ID from BIDS project, e.g., 10245
+            path_to_T1 : str | Relative path to participant's T1 scan
+            suppress: Boolean | if True, print statements are suppressed
+      """
+
+      output_path = os.path.join(f'./participant_images/sub-{sub_id}')
+
+      """
+      print('\n== Plotting mosaic ==')
+      k = nip.plot_anat(path_to_T1, draw_cross=False, display_mode='mosaic',
+                        dim=-1.65, threshold=5.,
+                        output_file=os.path.join(output_path, f'sub-{sub_id}_T1w-mosaic.png'))
+
+      """
+
+      if not suppress:
+            print('\n== Plotting ortho ==')
+
+      m = nip.plot_anat(path_to_T1, draw_cross=False, display_mode='ortho',
+                        dim=-1.65, threshold=5.,
+                        output_file=os.path.join(output_path, f'sub-{sub_id}_T1w-ortho.png'))
+
+
+      if not suppress:
+            print('\n== Plotting mid-saggital ==')
+
+      s = nip.plot_anat(path_to_T1, 
+                        draw_cross=False, 
+                        display_mode='x',
+                        dim=-1.65, threshold=5.,
+                        output_file=os.path.join(output_path, f'sub-{sub_id}_T1w-saggital.png'))
+
+
+def run_single_subject(sub_id, bids_root, files=None, suppress=False):
+      """
+      Makes the output folder, finds the T1w and saves its plots
+
+      Parameters
+            sub_id: str | Subject ID from BIDS project, e.g., 10245
+            bids_root: str | Relative path to top of BIDS project
+            files: list | Cached recursive listing of the subject (globbed if None)
+            suppress: Boolean | if True, print statements are suppressed
+      """
+
+      # Create subject specific output directory
+      make_output_file(sub_id=sub_id, suppress=suppress)
+
+      # Isolate path to T1w scan
+      path_to_T1 = isolate_anat_path(sub_id=sub_id, bids_root=bids_root, files=files)
+
+      # Plot and save anatomical plots
+      build_plots(sub_id=sub_id, path_to_T1=path_to_T1, suppress=suppress)
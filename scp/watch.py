@@ -0,0 +1,380 @@
+"""
+ABOUT THIS MODULE
+
+We collect data on a rolling basis, and new subjects land on Oak
+whenever Flywheel exports them. This stage watches the BIDS root for
+new sub-* folders, waits until a folder stops changing, and then runs
+our normalization stages and queues fmriprep for just those subjects
+
+On local disks we sleep on inotify so new folders are picked up right
+away. Oak is Lustre, where inotify never sees writes from other nodes,
+so there we fall back to cheap mtime polling
+
+python3 -m scp watch ../bids --settle 300 --job-script preprocessing/scripts/Job-Script.sh
+
+Ian Richard Ferguson | Stanford University
+"""
+
+# --- Imports
+import os, select, subprocess, time
+from datetime import datetime
+
+from scp.project import Project
+
+
+# inotify never fires for writes made from other clients on these
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "lustre", "cifs", "smb3", "smbfs",
+                       "gpfs", "beegfs", "fuse.sshfs", "9p"}
+
+# inotify(7) event masks
+IN_MODIFY, IN_ATTRIB, IN_MOVED_TO, IN_CREATE = 0x002, 0x004, 0x080, 0x100
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+
+
+# --- Helpers
+def filesystem_type(path):
+      """
+      Looks up the filesystem type of the mount that holds a path
+
+      Parameters
+            path: str | Any path on disk
+
+      Returns
+            Filesystem type (e.g., ext4, lustre) or None if unknown
+      """
+
+      path = os.path.realpath(path)
+      best_mount, best_type = "", None
+
+      try:
+            with open("/proc/mounts") as mounts:
+                  for line in mounts:
+                        parts = line.split()
+                        mount, fstype = parts[1].replace("\\040", " "), parts[2]
+
+                        # Longest mount point that contains the path wins
+                        if path == mount or path.startswith(mount.rstrip("/") + "/"):
+                              if len(mount) > len(best_mount):
+                                    best_mount, best_type = mount, fstype
+      except OSError:
+            return None
+
+      return best_type
+
+
+def subject_signature(path_to_sub_dir):
+      """
+      Cheap summary of a subject folder used to tell when it stops changing
+
+      Parameters
+            path_to_sub_dir: str | Relative path to subject's BIDS data
+
+      Returns
+            Tuple of (entry count, total bytes, newest mtime)
+      """
+
+      count, size, newest = 0, 0, 0
+
+      for root, dirs, files in os.walk(path_to_sub_dir):
+            for name in dirs + files:
+                  try:
+                        stat = os.stat(os.path.join(root, name))
+                  except FileNotFoundError:
+                        # Moved while we were walking, next pass will see it
+                        continue
+
+                  count += 1
+                  size += stat.st_size
+                  newest = max(newest, stat.st_mtime_ns)
+
+      return (count, size, newest)
+
+
+def open_inotify(path):
+      """
+      Starts an inotify watch on a directory
+
+      Parameters
+            path: str | Directory to watch
+
+      Returns
+            File descriptor to select() on, or None if inotify is unavailable
+      """
+
+      try:
+            import ctypes, ctypes.util
+
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+      except (OSError, AttributeError):
+            return None
+
+      if fd < 0:
+            return None
+
+      mask = IN_CREATE | IN_MOVED_TO | IN_MODIFY | IN_ATTRIB
+      if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+            os.close(fd)
+            return None
+
+      return fd
+
+
+def batch_stamp():
+      """
+      Timestamp that names one watch batch's logs and fmriprep list
+      """
+
+      return datetime.today().strftime("%Y_%b_%d_%H%M%S")
+
+
+def queue_subjects(subjects, job_script=None, stamp=None):
+      """
+      Queues fmriprep for the given subjects. The IDs are always written
+      to a text file; with a job script they are also submitted to SLURM
+
+      Parameters
+            subjects: list | Subjects that are ready for preprocessing
+            job_script: str | Path to Job-Script.sh (optional)
+            stamp: str | Prefix for the text file (defaults to now)
+      """
+
+      from scp import fmriprep_queue
+
+      stamp = stamp or batch_stamp()
+      fmriprep_queue.write_locally(new_subjects=subjects,
+                                   filename=f"{stamp}_fmriprep.txt")
+
+      if job_script is not None:
+            subprocess.run(["bash", job_script] + list(subjects), check=True)
+
+
+# --- Objects
+class Watcher:
+      """
+      Detects newly arrived subjects and hands them off once they settle
+
+      Parameters
+            bids_root: str | Relative path to top of BIDS project
+            settle: float | Seconds a folder must stay unchanged before processing
+            interval: float | Seconds between polls
+            stages: list | Stages from scp.cli.STAGES run on each new subject
+            job_script: str | Job-Script.sh to submit new subjects with (optional)
+            include_existing: Boolean | if True, subjects already on disk that
+                  have not been preprocessed count as new
+            poll: Boolean | Force mtime polling (None picks based on the filesystem)
+            on_ready: callable | Replaces the default process step, called with a list
+                  and returning the subjects to retry (None if all went through)
+            executor: IOExecutor | I/O pool used while processing (sequential if None)
+            clock: callable | Monotonic time source (swappable in tests)
+      """
+
+      def __init__(self, bids_root, settle=300, interval=30, stages=None,
+                   job_script=None, include_existing=False, poll=None,
+                   on_ready=None, executor=None, clock=time.monotonic):
+
+            self.bids_root = bids_root
+            self.settle = settle
+            self.interval = interval
+            self.stages = stages
+            self.job_script = job_script
+            self.on_ready = on_ready or self.process
+            self.executor = executor
+            self.clock = clock
+
+            # Subjects we never need to look at again
+            self.known = set(self.scan())
+
+            if include_existing:
+                  from scp.fmriprep_queue import get_preprocessed
+
+                  prep = os.path.join(bids_root, "derivatives/fmriprep")
+                  self.known &= set(get_preprocessed(path_to_prep=prep))
+
+            # Subject -> (signature, time that signature was first seen)
+            self.pending = {}
+
+            # Subject -> signature when it failed, retried once that changes
+            self.failed = {}
+
+            if poll is None:
+                  poll = filesystem_type(bids_root) in NETWORK_FILESYSTEMS
+
+            self.inotify_fd = None if poll else open_inotify(bids_root)
+
+
+      def scan(self):
+            """
+            Subject IDs currently in the BIDS root
+            """
+
+            return Project(self.bids_root).get_subjects()
+
+
+      def poll_once(self):
+            """
+            Runs a single detection pass
+
+            Returns
+                  List of subjects that settled and were processed on this pass
+            """
+
+            now = self.clock()
+            current = set(self.scan())
+
+            # Folders deleted before they settled
+            for sub in list(self.pending):
+                  if sub not in current:
+                        del self.pending[sub]
+
+            ready = []
+
+            for sub in sorted(self.pending):
+                  signature = subject_signature(os.path.join(self.bids_root, f"sub-{sub}"))
+                  old_signature, since = self.pending[sub]
+
+                  if signature != old_signature:
+                        self.pending[sub] = (signature, now)
+                  elif now - since >= self.settle:
+                        ready.append(sub)
+
+            # Failed subjects go back to settling once someone fixes their files
+            for sub in sorted(self.failed):
+                  if sub not in current:
+                        del self.failed[sub]
+                        continue
+
+                  signature = subject_signature(os.path.join(self.bids_root, f"sub-{sub}"))
+
+                  if signature != self.failed[sub]:
+                        print(f"\n** sub-{sub} changed since it failed, retrying **\n")
+                        del self.failed[sub]
+                        self.pending[sub] = (signature, now)
+
+            # New arrivals are only checked for settling on the next pass
+            for sub in sorted(current - self.known - set(self.pending) - set(self.failed)):
+                  print(f"\n** New subject detected: sub-{sub} **\n")
+                  signature = subject_signature(os.path.join(self.bids_root, f"sub-{sub}"))
+                  self.pending[sub] = (signature, now)
+
+            if ready:
+                  for sub in ready:
+                        del self.pending[sub]
+
+                  try:
+                        retry = set(self.on_ready(ready) or [])
+                  except Exception as e:
+                        print(f"\n** Processing failed for {' '.join(ready)}:\t{e} **\n")
+                        retry = set(ready)
+
+                  for sub in ready:
+                        if sub in retry:
+                              # Taken after processing so our own renames don't count as a fix
+                              self.failed[sub] = subject_signature(
+                                    os.path.join(self.bids_root, f"sub-{sub}"))
+                        else:
+                              self.known.add(sub)
+
+            return ready
+
+
+      def process(self, subjects):
+            """
+            Default hand-off: normalize the new subjects, then queue fmriprep
+            for the ones that came through every stage cleanly
+
+            Returns
+                  Subjects that were held back and should be retried
+            """
+
+            from scp.cli import STAGES, STAGE_LOGS, DEFAULT_PIPELINE, log_path
+
+            project = Project(self.bids_root, executor=self.executor)
+            failed = set()
+
+            # Every batch gets its own logs so earlier failures stay readable
+            stamp = batch_stamp()
+            logs = []
+
+            # One call per stage so each stage log covers the whole batch
+            for stage in self.stages or DEFAULT_PIPELINE:
+                  remaining = [x for x in subjects if x not in failed]
+
+                  if not remaining:
+                        break
+
+                  if stage in STAGE_LOGS:
+                        logs.append(log_path(stage, f"{stamp}_"))
+
+                  try:
+                        failed.update(STAGES[stage](project, remaining, log_prefix=f"{stamp}_") or [])
+                  except Exception as e:
+                        print(f"\n** {stage} failed for {' '.join(remaining)}:\t{e} **\n")
+                        failed.update(remaining)
+
+            clean = [x for x in subjects if x not in failed]
+
+            if failed:
+                  print(f"\n** Held back {' '.join(sorted(failed))}, see {', '.join(logs) or 'output above'} **\n")
+
+            if clean:
+                  try:
+                        queue_subjects(clean, job_script=self.job_script, stamp=stamp)
+                        print(f"\n** Queued {' '.join(clean)} for fmriprep **\n")
+                  except Exception as e:
+                        print(f"\n** Could not queue {' '.join(clean)}:\t{e} **\n")
+                        failed.update(clean)
+
+            return sorted(failed)
+
+
+      def wait(self, timeout):
+            """
+            Sleeps until the next pass, waking early on inotify events
+            """
+
+            if self.inotify_fd is None:
+                  time.sleep(timeout)
+                  return
+
+            readable, _, _ = select.select([self.inotify_fd], [], [], timeout)
+
+            # Drain the queue, we only care that something happened
+            if readable:
+                  try:
+                        while os.read(self.inotify_fd, 65536):
+                              pass
+                  except BlockingIOError:
+                        pass
+
+
+      def run(self, max_passes=None):
+            """
+            Polls until interrupted (or for max_passes passes)
+            """
+
+            mode = "mtime polling" if self.inotify_fd is None else "inotify"
+            print(f"\n** Watching {self.bids_root} ({mode}) **\n")
+
+            passes = 0
+
+            try:
+                  while max_passes is None or passes < max_passes:
+                        self.poll_once()
+                        passes += 1
+
+                        if max_passes is None or passes < max_passes:
+                              self.wait(self.interval)
+
+            except KeyboardInterrupt:
+                  print("\n** Stopped watching **\n")
+
+            finally:
+                  self.close()
+
+
+      def close(self):
+
+            if self.inotify_fd is not None:
+                  os.close(self.inotify_fd)
+                  self.inotify_fd = None
@@ -1,8 +1,7 @@
 #!/bin/bash
 
 # Runs our processing scripts in one shot
+# Both stages share one Python process (see scp/cli.py)
 # Ian Richard Ferguson | Stanford University
 
-python3 directory_hierarchy.py ../bids $1
-
-python3 session_cleanup.py ../bids $1
\ No newline at end of file
+PYTHONPATH="$(dirname "$0")/..:$PYTHONPATH" python3 -m scp pipeline ../bids $1 --stages hierarchy cleanup